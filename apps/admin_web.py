@@ -22,41 +22,40 @@ async def admin_root() -> RedirectResponse:
 @router.get("/login", response_class=HTMLResponse)
 async def login(request: Request) -> HTMLResponse:
     return templates.TemplateResponse(
-        "login.html", {"request": request, "page": "login", "title": "登录"}
+        request, "login.html", {"page": "login", "title": "登录"}
     )
 
 
 @router.get("/dashboard", response_class=HTMLResponse)
 async def dashboard(request: Request) -> HTMLResponse:
     return templates.TemplateResponse(
-        "dashboard.html", {"request": request, "page": "dashboard", "title": "仪表盘"}
+        request, "dashboard.html", {"page": "dashboard", "title": "仪表盘"}
     )
 
 
 @router.get("/resources", response_class=HTMLResponse)
 async def resources(request: Request) -> HTMLResponse:
     return templates.TemplateResponse(
-        "resources.html", {"request": request, "page": "resources", "title": "资源管理"}
+        request, "resources.html", {"page": "resources", "title": "资源管理"}
     )
 
 
 @router.get("/categories", response_class=HTMLResponse)
 async def categories(request: Request) -> HTMLResponse:
     return templates.TemplateResponse(
-        "categories.html",
-        {"request": request, "page": "categories", "title": "分类管理"},
+        request, "categories.html", {"page": "categories", "title": "分类管理"}
     )
 
 
 @router.get("/teams", response_class=HTMLResponse)
 async def teams(request: Request) -> HTMLResponse:
     return templates.TemplateResponse(
-        "teams.html", {"request": request, "page": "teams", "title": "团队与邀请"}
+        request, "teams.html", {"page": "teams", "title": "团队与邀请"}
     )
 
 
 @router.get("/system", response_class=HTMLResponse)
 async def system(request: Request) -> HTMLResponse:
     return templates.TemplateResponse(
-        "system.html", {"request": request, "page": "system", "title": "系统管理"}
+        request, "system.html", {"page": "system", "title": "系统管理"}
     )
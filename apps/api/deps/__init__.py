@@ -4,11 +4,12 @@ from sqlalchemy.orm import Session
 from collections.abc import Iterator
 
 from packages.core.auth import Principal, Role, verify_token
-from packages.db import SessionLocal
+from packages import db
 
 
 def get_db() -> Iterator[Session]:
-    session = SessionLocal()
+    # Late-bound so `configure_engine` can swap the factory at runtime.
+    session = db.SessionLocal()
     try:
         yield session
     finally:
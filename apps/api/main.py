@@ -12,8 +12,9 @@ from starlette.staticfiles import StaticFiles
 
 from apps import admin_web
 from apps.api.routers import admin, build, categories, resources, session, teams
+from packages import db
 from packages.core.auth import Role, hash_token
-from packages.db import Auth, create_all, engine, ensure_build_state, session_scope
+from packages.db import Auth, configure_engine, create_all, ensure_build_state, session_scope
 from packages.worker.build import run_build_pipeline
 from packages.worker.dht import run_dht_health_scan
 
@@ -23,9 +24,9 @@ scheduler = AsyncIOScheduler()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_all(engine)
-    with session_scope() as db:
-        ensure_build_state(db)
+    create_all(db.engine)
+    with session_scope() as session_db:
+        ensure_build_state(session_db)
     ensure_admin_token()
     start_scheduler()
     try:
@@ -34,52 +35,76 @@ async def lifespan(app: FastAPI):
         stop_scheduler()
 
 
-app = FastAPI(title="Ghost API", lifespan=lifespan)
-
-
-app.include_router(session.router, prefix="/api")
-app.include_router(build.router, prefix="/api")
-app.include_router(resources.router, prefix="/api")
-app.include_router(categories.router, prefix="/api")
-app.include_router(teams.router, prefix="/api")
-app.include_router(admin.router, prefix="/api")
-app.include_router(admin_web.router)
-app.mount(
-    "/admin/static", StaticFiles(directory=admin_web.STATIC_DIR), name="admin-static"
-)
+def mount_public_site(app: FastAPI, workdir: str | Path) -> bool:
+    """Mount the generated public site from `workdir` at / on an existing app."""
+    public_dir = Path(workdir) / "public"
+    if not public_dir.exists():
+        return False
+    app.mount("/", StaticFiles(directory=public_dir, html=True), name="ghost-public")
+    logger.info("Mounted public site at / from %s", public_dir)
+    return True
 
 
 # Integrated deployment can optionally mount the generated static site.
 def maybe_mount_public_site(app: FastAPI) -> bool:
     deploy_mode = os.getenv("GHOST_DEPLOY_MODE", "standard").lower()
-    public_dir = Path(os.getenv("GHOST_SITE_WORKDIR", "var/site-workdir")) / "public"
-    should_mount = deploy_mode == "integrated"
-    if not should_mount:
-        return False
-    if not public_dir.exists():
-        logger.warning("Integrated mode enabled but public dir missing: %s", public_dir)
+    if deploy_mode != "integrated":
         return False
-    app.mount("/", StaticFiles(directory=public_dir, html=True), name="ghost-public")
-    logger.info("Mounted public site at / from %s", public_dir)
-    return True
+    workdir = os.getenv("GHOST_SITE_WORKDIR", "var/site-workdir")
+    mounted = mount_public_site(app, workdir)
+    if not mounted:
+        logger.warning(
+            "Integrated mode enabled but public dir missing: %s", Path(workdir) / "public"
+        )
+    return mounted
+
+
+def create_app(db_url: str | None = None) -> FastAPI:
+    """Build the Ghost API app, optionally bound to a fresh database URL.
+
+    Env-dependent wiring (integrated public-site mount) is evaluated per call,
+    so tests can construct apps against temporary databases and workdirs
+    without reloading modules.
+    """
+    if db_url is not None:
+        configure_engine(db_url)
+
+    app = FastAPI(title="Ghost API", lifespan=lifespan)
+
+    app.include_router(session.router, prefix="/api")
+    app.include_router(build.router, prefix="/api")
+    app.include_router(resources.router, prefix="/api")
+    app.include_router(categories.router, prefix="/api")
+    app.include_router(teams.router, prefix="/api")
+    app.include_router(admin.router, prefix="/api")
+    app.include_router(admin_web.router)
+    app.mount(
+        "/admin/static",
+        StaticFiles(directory=admin_web.STATIC_DIR),
+        name="admin-static",
+    )
 
+    public_mounted = maybe_mount_public_site(app)
 
-public_mounted = maybe_mount_public_site(app)
+    # Provide a tiny landing page only when public site is not mounted.
+    if not public_mounted:
 
-# Provide a tiny landing page only when public site is not mounted.
-if not public_mounted:
+        @app.get("/", tags=["meta"])
+        async def root():
+            return JSONResponse(
+                {
+                    "app": "ghost",
+                    "status": "ok",
+                    "api_base": "/api",
+                    "docs": "/docs",
+                    "message": "Ghost server running. Use /docs for API docs or /api for endpoints.",
+                }
+            )
 
-    @app.get("/", tags=["meta"])
-    async def root():
-        return JSONResponse(
-            {
-                "app": "ghost",
-                "status": "ok",
-                "api_base": "/api",
-                "docs": "/docs",
-                "message": "Ghost server running. Use /docs for API docs or /api for endpoints.",
-            }
-        )
+    return app
+
+
+app = create_app()
 
 
 def start_scheduler() -> None:
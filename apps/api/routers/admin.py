@@ -65,17 +65,23 @@ def create_publisher_token(
     )
 
 
+def get_dht_scan_runner():
+    """Dependency hook for the full-scan coroutine; overridable in tests."""
+    return run_dht_health_scan_all
+
+
 @router.post("/dht/scan-all")
 async def scan_all_magnets(
     wait: bool = False,
     timeout_s: int | None = None,
     principal=Depends(require_roles(Role.ADMIN)),
+    scan_runner=Depends(get_dht_scan_runner),
 ):
     """Trigger a full DHT scan for all magnets (Admin only)."""
     if wait:
-        changed = await run_dht_health_scan_all(timeout_s=timeout_s)
+        changed = await scan_runner(timeout_s=timeout_s)
         return {"queued": False, "changed": changed}
 
     # Fire-and-forget so the admin UI stays responsive.
-    asyncio.create_task(run_dht_health_scan_all(timeout_s=timeout_s))
+    asyncio.create_task(scan_runner(timeout_s=timeout_s))
     return {"queued": True}
@@ -1,4 +1,4 @@
-from packages.db.engine import SessionLocal, engine, session_scope
+from packages.db.engine import SessionLocal, configure_engine, engine, session_scope
 from packages.db.models import (
     Auth,
     Base,
@@ -12,6 +12,7 @@ from packages.db.models import (
 
 __all__ = [
     "SessionLocal",
+    "configure_engine",
     "engine",
     "session_scope",
     "Base",
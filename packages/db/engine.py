@@ -1,10 +1,13 @@
 import os
+import sys
 from contextlib import contextmanager
 from pathlib import Path
 from typing import Iterator
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 # SQLite file lives under var/db by default to match docs.
 DEFAULT_DB_PATH = "var/db/ghost.db"
@@ -27,8 +30,54 @@ def get_database_url() -> str:
     return f"sqlite:///{db_path}"
 
 
+def _engine_kwargs(db_url: str) -> dict:
+    """Extra create_engine arguments derived from the URL.
+
+    In-memory SQLite only exists per connection, so share a single connection
+    across threads via StaticPool; otherwise every checkout would see an
+    empty database.
+    """
+    if db_url == "sqlite://" or db_url.endswith(":memory:"):
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    if not db_url.startswith("sqlite"):
+        # Server-backed databases: recycle idle connections and probe before use.
+        return {"pool_pre_ping": True, "pool_recycle": 300}
+    return {}
+
+
+def _make_session_factory(bind: Engine) -> sessionmaker:
+    # expire_on_commit=False: session_scope callers read attributes after
+    # commit (IDs, timestamps); keeping them loaded avoids a refetch per object.
+    return sessionmaker(
+        bind=bind,
+        autoflush=False,
+        autocommit=False,
+        expire_on_commit=False,
+        future=True,
+    )
+
+
 engine = create_engine(get_database_url(), future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+SessionLocal = _make_session_factory(engine)
+
+
+def configure_engine(db_url: str | None = None) -> Engine:
+    """Rebind the module-level engine/session factory to a database URL.
+
+    Used by `apps.api.main.create_app` and tests to point the whole process
+    (including `session_scope` callers) at a different database without
+    reloading modules. Defaults to the env-derived URL.
+    """
+    global engine, SessionLocal
+    db_url = db_url or get_database_url()
+    engine = create_engine(db_url, future=True, **_engine_kwargs(db_url))
+    SessionLocal = _make_session_factory(engine)
+    # Keep the package-level re-exports in sync for by-value importers.
+    pkg = sys.modules.get("packages.db")
+    if pkg is not None:
+        pkg.engine = engine
+        pkg.SessionLocal = SessionLocal
+    return engine
 
 
 @contextmanager
@@ -26,6 +26,13 @@ class RestoreResult:
     reason: str | None = None
 
 
+def _decode_stderr(exc: subprocess.CalledProcessError) -> str:
+    raw = exc.stderr or exc.stdout or b""
+    if isinstance(raw, bytes):
+        return raw.decode(errors="replace").strip() or str(exc)
+    return str(raw).strip() or str(exc)
+
+
 def _resolve_sqlite_path(db_path_or_url: str) -> Path | None:
     if "://" not in db_path_or_url:
         return Path(db_path_or_url)
@@ -74,17 +81,18 @@ def create_age_encrypted_db_backup(
     out = backup_dir_path / f"ghost-db-{ts}.db.age"
 
     try:
-        subprocess.run(
-            [age_bin, "-r", recipient, "-o", str(out), str(db_path)],
+        # Pipe the DB through stdin/stdout so `age` never touches the filesystem;
+        # the ciphertext is written out in a single pass.
+        proc = subprocess.run(
+            [age_bin, "-r", recipient],
+            input=db_path.read_bytes(),
             check=True,
             capture_output=True,
-            text=True,
         )
     except subprocess.CalledProcessError as exc:
-        logger.warning(
-            "age backup failed: %s", (exc.stderr or exc.stdout or str(exc)).strip()
-        )
+        logger.warning("age backup failed: %s", _decode_stderr(exc))
         return BackupResult(skipped=True, output_path=None, reason="age command failed")
+    out.write_bytes(proc.stdout)
 
     logger.info("Created encrypted DB backup: %s", out)
     return BackupResult(skipped=False, output_path=str(out), reason=None)
@@ -113,27 +121,18 @@ def restore_age_encrypted_db_backup(
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
     try:
-        subprocess.run(
-            [
-                age_bin,
-                "-d",
-                "-i",
-                str(identity_file),
-                "-o",
-                str(out_path),
-                str(in_path),
-            ],
+        proc = subprocess.run(
+            [age_bin, "-d", "-i", str(identity_file)],
+            input=in_path.read_bytes(),
             check=True,
             capture_output=True,
-            text=True,
         )
     except subprocess.CalledProcessError as exc:
-        logger.warning(
-            "age restore failed: %s", (exc.stderr or exc.stdout or str(exc)).strip()
-        )
+        logger.warning("age restore failed: %s", _decode_stderr(exc))
         return RestoreResult(
             skipped=True, output_path=None, reason="age command failed"
         )
+    out_path.write_bytes(proc.stdout)
 
     return RestoreResult(skipped=False, output_path=str(out_path), reason=None)
 
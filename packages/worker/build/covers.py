@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import logging
 import os
 import re
@@ -67,17 +68,24 @@ def localize_cover_images(
     repo: SiteRepo,
     *,
     fetch: Callable[[str, int], DownloadedFile] = _default_fetch,
+    convert: Callable[[bytes], bytes | None] | None = None,
     timeout_s: int | None = None,
 ) -> int:
     """Download remote cover_image_url into the Hugo repo and set cover_image_path.
 
     This is best-effort: failures are logged and skipped to keep builds resilient.
+    `convert` turns raw bytes into webp (or None to keep the original format);
+    callers can inject a no-op to skip the image round-trip.
     """
+    convert = convert or _maybe_convert_to_webp
     timeout_s = timeout_s or int(os.getenv("GHOST_COVER_FETCH_TIMEOUT_S", "15"))
     covers_dir = repo.static_dir / "assets" / "covers"
     covers_dir.mkdir(parents=True, exist_ok=True)
 
     updated = 0
+    # Dedupe the (expensive) webp conversion by content fingerprint within
+    # this run; the same cover bytes often back several resources.
+    converted: dict[str, bytes | None] = {}
     q = session.query(Resource).filter(
         Resource.takedown_at.is_(None), Resource.cover_image_url.isnot(None)
     )
@@ -104,7 +112,11 @@ def localize_cover_images(
             logger.info("Cover download failed (id=%s): %s", resource.id, exc)
             continue
 
-        webp = _maybe_convert_to_webp(downloaded.content)
+        fingerprint = hashlib.sha1(downloaded.content).hexdigest()
+        if fingerprint in converted:
+            webp = converted[fingerprint]
+        else:
+            webp = converted[fingerprint] = convert(downloaded.content)
         if webp is not None:
             out_name = f"{resource.id}.webp"
             out_bytes = webp
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 from collections import defaultdict
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Iterable
 
@@ -13,12 +14,17 @@ def _summarize(text: str, limit: int = 240) -> str:
     return compact if len(compact) <= limit else compact[: limit - 3] + "..."
 
 
-def export_search_index(resources: Iterable[dict], repo: SiteRepo) -> None:
-    """Generate sharded search index JSON files under static/index."""
-    index_dir = repo.static_dir / "index"
-    index_dir.mkdir(parents=True, exist_ok=True)
+@dataclass(frozen=True)
+class SearchIndex:
+    """In-memory search index: manifest plus shard payloads keyed by file name."""
 
-    shards: dict[str, list[dict]] = defaultdict(list)
+    manifest: dict
+    shards: dict[str, dict]
+
+
+def build_search_index(resources: Iterable[dict]) -> SearchIndex:
+    """Assemble the sharded search index without touching the filesystem."""
+    grouped: dict[str, list[dict]] = defaultdict(list)
     for item in resources:
         published_at: datetime | None = item.get("published_at")
         shard_key = (
@@ -26,27 +32,39 @@ def export_search_index(resources: Iterable[dict], repo: SiteRepo) -> None:
             if isinstance(published_at, datetime)
             else "unknown"
         )
-        shards[shard_key].append(item)
+        grouped[shard_key].append(item)
 
     manifest_shards: list[dict[str, object]] = []
     manifest: dict[str, object] = {
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "shards": manifest_shards,
     }
-    for shard_key, items in sorted(shards.items()):
+    shard_payloads: dict[str, dict] = {}
+    for shard_key, items in sorted(grouped.items()):
         file_name = f"index-{shard_key}.json"
         manifest_shards.append(
             {"key": shard_key, "file": file_name, "count": len(items)}
         )
-        enriched = [_serialize_item(i) for i in items]
+        shard_payloads[file_name] = {"items": [_serialize_item(i) for i in items]}
+    return SearchIndex(manifest=manifest, shards=shard_payloads)
+
+
+def export_search_index(resources: Iterable[dict], repo: SiteRepo) -> SearchIndex:
+    """Generate sharded search index JSON files under static/index."""
+    index_dir = repo.static_dir / "index"
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    index = build_search_index(resources)
+    for file_name, payload in index.shards.items():
         (index_dir / file_name).write_text(
-            json.dumps({"items": enriched}, ensure_ascii=False, indent=2),
+            json.dumps(payload, ensure_ascii=False, indent=2),
             encoding="utf-8",
         )
 
     (index_dir / "manifest.json").write_text(
-        json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8"
+        json.dumps(index.manifest, ensure_ascii=False, indent=2), encoding="utf-8"
     )
+    return index
 
 
 def _serialize_item(item: dict) -> dict:
@@ -82,4 +100,4 @@ def _iso(dt) -> str | None:
     return None
 
 
-__all__ = ["export_search_index"]
+__all__ = ["SearchIndex", "build_search_index", "export_search_index"]
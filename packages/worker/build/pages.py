@@ -45,8 +45,6 @@ def deploy_public_dir_to_pages(
     env.setdefault("GIT_TERMINAL_PROMPT", "0")
 
     _git(deploy_root, ["init"], env=env)
-    _git(deploy_root, ["config", "user.name", config.git_user_name], env=env)
-    _git(deploy_root, ["config", "user.email", config.git_user_email], env=env)
     _git(deploy_root, ["remote", "add", "origin", config.remote_url], env=env)
 
     # Keep history when the branch exists; otherwise create it.
@@ -74,7 +72,20 @@ def deploy_public_dir_to_pages(
         return _git_output(deploy_root, ["rev-parse", "HEAD"], env=env).strip()
 
     msg = f"Deploy {datetime.now(timezone.utc).isoformat(timespec='seconds')}"
-    _git(deploy_root, ["commit", "-m", msg], env=env)
+    # Identity via -c instead of two `git config` processes per deploy.
+    _git(
+        deploy_root,
+        [
+            "-c",
+            f"user.name={config.git_user_name}",
+            "-c",
+            f"user.email={config.git_user_email}",
+            "commit",
+            "-m",
+            msg,
+        ],
+        env=env,
+    )
     commit = _git_output(deploy_root, ["rev-parse", "HEAD"], env=env).strip()
 
     push_args = ["push", "origin", config.branch]
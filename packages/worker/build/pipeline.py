@@ -4,6 +4,7 @@ import logging
 import os
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from typing import Callable
 
 from sqlalchemy.orm import Session
 
@@ -66,9 +67,23 @@ def _should_build(session: Session, force: bool) -> BuildState | None:
     return state
 
 
-def run_build_pipeline(force: bool = False, config: BuildConfig | None = None) -> None:
-    """Main entry for the background build job."""
+def run_build_pipeline(
+    force: bool = False,
+    config: BuildConfig | None = None,
+    *,
+    hugo_runner: Callable[..., None] | None = None,
+    cover_localizer: Callable[..., int] | None = None,
+    backup_fn: Callable[..., object] | None = None,
+) -> None:
+    """Main entry for the background build job.
+
+    The Hugo/cover/backup steps are injectable so tests can stub them without
+    patching module attributes.
+    """
     config = config or load_build_config()
+    hugo_runner = hugo_runner or run_hugo_build
+    cover_localizer = cover_localizer or localize_cover_images
+    backup_fn = backup_fn or create_age_encrypted_db_backup
 
     with session_scope() as session:
         state = _should_build(session, force)
@@ -77,13 +92,13 @@ def run_build_pipeline(force: bool = False, config: BuildConfig | None = None) -
         repo = SiteRepo(config.site_workdir)
         ensure_hugo_scaffold(repo, base_url=config.base_url)
         try:
-            localized = localize_cover_images(session, repo)
+            localized = cover_localizer(session, repo)
             if localized:
                 logger.info("Localized %s cover image(s)", localized)
             public_resources = export_content(session, repo)
             export_search_index(public_resources, repo)
-            run_hugo_build(repo, hugo_bin=config.hugo_bin)
-            create_age_encrypted_db_backup()
+            hugo_runner(repo, hugo_bin=config.hugo_bin)
+            backup_fn()
             pages_commit = None
             if config.deploy_mode == "standard":
                 if not config.pages_remote_url:
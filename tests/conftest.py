@@ -1,29 +1,144 @@
+import asyncio
 import os
+import re
+import shutil
 import sys
 import tempfile
 from pathlib import Path
 
+import httpx
+import orjson
+import yaml
+
 os.environ.setdefault("PYTEST_DISABLE_PLUGIN_AUTOLOAD", "1")
 from typing import Iterator
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 # Ensure project root is importable
 ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+# Keep the import-time default engine off the repo's var/ directory; the
+# session fixtures rebind to their own URLs anyway.
+os.environ.setdefault("GHOST_DB_PATH", "sqlite://")
+
 from packages import db  # noqa: E402
 from packages.db import Base  # noqa: E402
-from packages.core.auth import hash_token, Role  # noqa: E402
+from packages.core import auth as core_auth  # noqa: E402
+from packages.core.auth import Role  # noqa: E402
+
+# Force hash_token's plain-SHA-256 fallback for the whole run. This must
+# happen at import time, not in a fixture: conftest loads before the test
+# modules, several of which hash tokens at module scope, and seeded hashes
+# must use the same scheme runtime verification does even when argon2 is
+# installed. hash_token consults this module global on every call.
+core_auth.hash_secret = None
+
+
+# Smallest valid PNG; shared by every test that fakes a cover download.
+ONE_BY_ONE_PNG = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01"
+    b"\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\x0bIDATx\x9cc``\x00"
+    b"\x00\x00\x02\x00\x01\xe2!\xbc3\x00\x00\x00\x00IEND\xaeB`\x82"
+)
+
+
+def auth_header(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def asgi_batch(app, requests: list[tuple]) -> list:
+    """Issue a batch of (method, url, kwargs) requests straight over ASGI.
+
+    Bypasses TestClient's sync-to-async thread bridge: one event loop and one
+    AsyncClient serve the whole batch. Requests run sequentially on purpose —
+    concurrent ones would interleave SAVEPOINTs on the single shared SQLite
+    connection and corrupt the per-test isolation transaction.
+    """
+
+    async def _run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://testserver"
+        ) as client:
+            return [
+                await client.request(method, url, **kwargs)
+                for method, url, kwargs in requests
+            ]
+
+    return asyncio.run(_run())
+
+
+def load_json(path: Path):
+    """Parse a JSON artifact via orjson, skipping the intermediate str decode."""
+    return orjson.loads(path.read_bytes())
+
+
+_FRONT_MATTER_RE = re.compile(r"\A---\n(.*?)\n---\n", re.DOTALL)
+
+
+def parse_front_matter(markdown: str) -> dict:
+    """Parse the YAML front-matter block of a generated content file.
+
+    Lets tests assert on fields as a dict instead of repeated substring scans
+    over the whole document.
+    """
+    match = _FRONT_MATTER_RE.match(markdown)
+    return yaml.safe_load(match.group(1)) if match else {}
+
+
+def pytest_sessionstart(session: pytest.Session) -> None:
+    # Resolve external binaries once instead of per fixture/test.
+    session.config._age_bin = shutil.which(os.getenv("GHOST_AGE_BIN", "age"))
+    session.config._age_keygen_bin = shutil.which("age-keygen")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _cached_hash_token() -> Iterator[None]:
+    """Memoize hash_token for the session.
+
+    The same handful of raw tokens is derived over and over by fixtures and
+    token verification. The argon2 fallback is disabled at conftest import
+    time (see above); this only removes the repeated derivations. hash_token
+    reads the pepper/salt env vars on every call and some tests monkeypatch
+    them, so they are part of the cache key — the token alone is not enough.
+    """
+    original = core_auth.hash_token
+    memo: dict[tuple[str, str, str], str] = {}
+
+    def cached(token: str) -> str:
+        key = (
+            token,
+            os.getenv("GHOST_TOKEN_PEPPER", ""),
+            os.getenv("GHOST_TOKEN_SALT", "ghost-static-salt"),
+        )
+        if key not in memo:
+            memo[key] = original(token)
+        return memo[key]
+
+    core_auth.hash_token = cached
+    try:
+        yield
+    finally:
+        core_auth.hash_token = original
+
+
+# Engine/session factory bound to the session-wide test DB; restored before
+# each test because some tests reload the engine modules against their own URL.
+_shared: dict = {}
 
 
 @pytest.fixture(scope="function")
-def db_url() -> Iterator[str]:
-    with tempfile.TemporaryDirectory() as tmpdir:
-        yield f"sqlite:///{tmpdir}/test.db"
+def db_url() -> str:
+    # In-memory DB; configure_engine applies StaticPool so one connection is
+    # shared. Tests exercising on-disk paths (backups) build their own URL.
+    return "sqlite:///:memory:"
 
 
 @pytest.fixture(scope="function")
@@ -33,46 +148,176 @@ def magnet_metadata_dir() -> Iterator[str]:
 
 
 def rebind_engine(db_url: str):
-    # Reload engine/session makers with a fresh SQLite URL.
-    import importlib
-
+    # Bind the process-wide engine to a fresh SQLite URL and build an app.
     os.environ["GHOST_DB_PATH"] = db_url
-    db_engine_module = importlib.reload(importlib.import_module("packages.db.engine"))
-    importlib.reload(importlib.import_module("packages.db"))
-    importlib.reload(importlib.import_module("apps.api.deps"))
-    api_main = importlib.reload(importlib.import_module("apps.api.main"))
+    from apps.api.main import create_app
+
+    app = create_app(db_url)
+    # Fresh database: skip the per-table PRAGMA reflection checkfirst does.
+    Base.metadata.create_all(db.engine, checkfirst=False)
+    return app
+
+
+def _restore_shared_engine() -> None:
+    """Point the module-level engine/session globals back at the shared test DB."""
+    engine = _shared["engine"]
+    session_local = _shared["SessionLocal"]
+    os.environ["GHOST_DB_PATH"] = _shared["db_url"]
+    engine_module = sys.modules["packages.db.engine"]
+    engine_module.engine = engine
+    engine_module.SessionLocal = session_local
+    db_module = sys.modules["packages.db"]
+    db_module.engine = engine
+    db_module.SessionLocal = session_local
+
+
+def _make_test_engine(db_url: str):
+    """Engine for the shared test DB, safe for SAVEPOINT-based isolation.
+
+    In-memory URLs get a StaticPool so every checkout (app requests, fixture
+    sessions, the per-test isolation connection) shares the one connection
+    that holds the database. `check_same_thread=False` lets the TestClient
+    portal thread reuse it, and the connect/begin listeners apply the
+    documented pysqlite workaround so SAVEPOINTs behave transactionally.
+    """
+    kwargs: dict = {"connect_args": {"check_same_thread": False}}
+    if db_url == "sqlite://" or db_url.endswith(":memory:"):
+        kwargs["poolclass"] = StaticPool
+    engine = create_engine(db_url, future=True, **kwargs)
+
+    @event.listens_for(engine, "connect")
+    def _do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return engine
+
+
+@pytest.fixture(scope="session")
+def hugo_scaffold_template(tmp_path_factory: pytest.TempPathFactory):
+    """Hugo scaffold written once per session.
+
+    The scaffold bytes are static, so tests that only read templates/static
+    assets can share this instance; tests needing a writable copy should
+    hard-link it into their own tmp_path instead of re-scaffolding.
+    """
+    from packages.worker.build.hugo import ensure_hugo_scaffold
+    from packages.worker.site_repo import SiteRepo
+
+    repo = SiteRepo(tmp_path_factory.mktemp("hugo-template") / "site")
+    ensure_hugo_scaffold(repo)
+    return repo
+
+
+# Pure in-memory DB shared through a StaticPool: no file I/O per statement,
+# and each pytest-xdist worker process naturally gets its own database.
+_SHARED_DB_URL = "sqlite://"
 
-    engine = db_engine_module.engine
-    Base.metadata.create_all(engine)
-    return api_main.app
+
+@pytest.fixture(scope="session")
+def shared_app(tmp_path_factory: pytest.TempPathFactory):
+    os.environ["GHOST_MAGNET_METADATA_BACKEND"] = "mock"
+    os.environ["GHOST_MAGNET_METADATA_DIR"] = str(
+        tmp_path_factory.mktemp("magnet-metadata")
+    )
+    os.environ["GHOST_ENABLE_SCHEDULER"] = "0"
+    # Default site workdir for tests that trigger builds without setting their
+    # own; keeps background pipelines from scaffolding into the repo's var/.
+    os.environ["GHOST_SITE_WORKDIR"] = str(tmp_path_factory.mktemp("site-workdir"))
+    engine = _make_test_engine(_SHARED_DB_URL)
+    _shared.update(
+        db_url=_SHARED_DB_URL,
+        engine=engine,
+        SessionLocal=sessionmaker(
+            bind=engine,
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False,
+            future=True,
+        ),
+    )
+    # The app and the fixtures must share this engine — a second in-memory
+    # engine would be a different database — so install it before create_app.
+    _restore_shared_engine()
+    # One-shot schema build; the in-memory DB is empty, so no checkfirst scan.
+    Base.metadata.create_all(engine, checkfirst=False)
+    from apps.api.main import create_app
+
+    return create_app()
+
+
+@pytest.fixture(scope="session")
+def session_client(shared_app) -> Iterator[TestClient]:
+    # Enter the client context once so lifespan/transport setup is paid per
+    # session. Earlier tests may have rebound the engine modules to their own
+    # temporary DB, so point them back at the shared one before startup runs.
+    _restore_shared_engine()
+    with TestClient(shared_app) as client:
+        yield client
 
 
 @pytest.fixture(scope="function")
-def test_client(db_url: str, magnet_metadata_dir: str, monkeypatch):
-    monkeypatch.setenv("GHOST_DB_PATH", db_url)
-    monkeypatch.setenv("GHOST_MAGNET_METADATA_BACKEND", "mock")
-    monkeypatch.setenv("GHOST_MAGNET_METADATA_DIR", magnet_metadata_dir)
-    app_instance = rebind_engine(db_url)
-    client = TestClient(app_instance)
-    yield client
+def isolated_db(shared_app) -> Iterator[None]:
+    """Wrap a test in an outer transaction that is rolled back on teardown.
+
+    Every session opened through the module-level factories joins the
+    transaction via a SAVEPOINT (`join_transaction_mode="create_savepoint"`),
+    so commits made by the app or by worker code are discarded afterwards and
+    each test still observes an empty database — without re-running DDL or
+    module reloads per test.
+    """
+    _restore_shared_engine()
+    connection = _shared["engine"].connect()
+    transaction = connection.begin()
+    bound_session = sessionmaker(
+        bind=connection,
+        autoflush=False,
+        autocommit=False,
+        expire_on_commit=False,
+        future=True,
+        join_transaction_mode="create_savepoint",
+    )
+    engine_module = sys.modules["packages.db.engine"]
+    db_module = sys.modules["packages.db"]
+    engine_module.SessionLocal = bound_session
+    db_module.SessionLocal = bound_session
+    try:
+        yield
+    finally:
+        engine_module.SessionLocal = _shared["SessionLocal"]
+        db_module.SessionLocal = _shared["SessionLocal"]
+        transaction.rollback()
+        connection.close()
 
 
 @pytest.fixture(scope="function")
-def seeded_tokens(test_client):
+def test_client(session_client: TestClient, isolated_db) -> TestClient:
+    return session_client
+
+
+@pytest.fixture(scope="session")
+def seeded_tokens(shared_app):
+    """Admin/publisher/team tokens seeded once into the shared test DB.
+
+    Committed at session scope, outside any per-test transaction, so every
+    test sees the rows; changes tests make to them (revocations, new tokens)
+    happen inside their SAVEPOINT and are rolled back.
+    """
     admin_token = "admin-token"
     publisher_token = "publisher-token"
     team_token = "team-token"
-    engine = db.engine
-    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
-    session = Session()
+    session = _shared["SessionLocal"]()
     try:
         admin = db.Auth(
-            token_hash=hash_token(admin_token),
+            token_hash=core_auth.hash_token(admin_token),
             role=Role.ADMIN.value,
             display_name="Admin",
         )
         publisher = db.Auth(
-            token_hash=hash_token(publisher_token),
+            token_hash=core_auth.hash_token(publisher_token),
             role=Role.PUBLISHER.value,
             display_name="Publisher",
         )
@@ -80,7 +325,7 @@ def seeded_tokens(test_client):
         session.add_all([admin, publisher, team])
         session.flush()
         team_member = db.Auth(
-            token_hash=hash_token(team_token),
+            token_hash=core_auth.hash_token(team_token),
             role=Role.TEAM_MEMBER.value,
             scope_team_id=team.id,
             display_name="Team Member",
@@ -98,12 +343,19 @@ def seeded_tokens(test_client):
         session.close()
 
 
+@pytest.fixture(scope="session")
+def auth_headers(seeded_tokens) -> dict[str, dict[str, str]]:
+    """Authorization headers for each seeded role, built once per session."""
+    return {
+        role: auth_header(token)
+        for role, token in seeded_tokens.items()
+        if role != "team_id"
+    }
+
+
 @pytest.fixture(scope="function")
 def db_session(test_client):
-    Session = sessionmaker(
-        bind=db.engine, autoflush=False, autocommit=False, future=True
-    )
-    session = Session()
+    session = sys.modules["packages.db.engine"].SessionLocal()
     try:
         yield session
     finally:
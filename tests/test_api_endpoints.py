@@ -1,13 +1,10 @@
 from fastapi.testclient import TestClient
 
+from conftest import auth_header
 from packages.core.auth import Role, hash_token
 from packages.db import Auth, Category, session_scope
 
 
-def auth_header(token: str) -> dict[str, str]:
-    return {"Authorization": f"Bearer {token}"}
-
-
 def seed_categories():
     with session_scope() as session:
         root = Category(
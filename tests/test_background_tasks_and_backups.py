@@ -1,14 +1,14 @@
 import asyncio
 import json
-import os
-import shutil
 import sqlite3
 import subprocess
 from datetime import datetime, timezone
 from pathlib import Path
 
 import pytest
+from sqlalchemy import select, true
 
+from conftest import ONE_BY_ONE_PNG
 from packages.core.auth import Role, hash_token
 from packages.core.public_export import resource_to_public
 from packages.db import (
@@ -28,25 +28,71 @@ from packages.worker.dht.scan import run_dht_health_scan
 from packages.worker.site_repo import SiteRepo
 
 
-_ONE_BY_ONE_PNG = (
-    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01"
-    b"\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\x0bIDATx\x9cc``\x00"
-    b"\x00\x00\x02\x00\x01\xe2!\xbc3\x00\x00\x00\x00IEND\xaeB`\x82"
+_AGE_KEYGEN_RECIPIENT_PREFIXES = ("# public key: ", "Public key: ")
+
+# Publisher hash derived once per module instead of per seeded resource.
+_PUB_HASH = hash_token("pub")
+
+# Fixed per-seed payload, built once at import instead of per call.
+_SEED_RESOURCE_DEFAULTS = dict(
+    title="Item",
+    content_markdown="hello",
+    tags_json=json.dumps(["t1"]),
+    team_id=None,
+    published_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
 )
 
-_AGE_KEYGEN_RECIPIENT_PREFIXES = ("# public key: ", "Public key: ")
 
+@pytest.fixture(autouse=True)
+def _seed_publisher(request):
+    """Insert the shared publisher row once per DB-backed test.
+
+    Keeps `_seed_minimal_resource` free of per-call Auth lookups; tests that
+    never touch the database (the age backup ones) are left alone.
+    """
+    if "test_client" in request.fixturenames:
+        request.getfixturevalue("test_client")
+        with session_scope() as session:
+            session.merge(
+                Auth(
+                    token_hash=_PUB_HASH,
+                    role=Role.PUBLISHER.value,
+                    display_name="Publisher",
+                )
+            )
+    yield
+
+
+@pytest.fixture(scope="module")
+def dht_loop():
+    """Share one event loop across the DHT scan tests instead of asyncio.run per test."""
+    loop = asyncio.new_event_loop()
+    try:
+        yield loop
+    finally:
+        loop.close()
+
+
+def _always_raise(exc: BaseException):
+    """Return a callable that raises `exc` when invoked with any arguments."""
+
+    def _raise(*args, **kwargs):
+        raise exc
 
-def _require_on_path(bin_name: str) -> str:
-    path = shutil.which(bin_name)
-    if path is None:
-        pytest.fail(f"Required binary `{bin_name}` not found in PATH", pytrace=False)
-    return path
+    return _raise
 
 
-def _generate_age_identity_and_recipient(*, identity_file: Path) -> str:
-    _require_on_path(os.getenv("GHOST_AGE_BIN", "age"))
-    age_keygen = _require_on_path("age-keygen")
+@pytest.fixture
+def age_bins(request) -> tuple[str, str]:
+    """Paths to `age`/`age-keygen`, resolved once at session start in conftest."""
+    age_bin = request.config._age_bin
+    age_keygen = request.config._age_keygen_bin
+    if age_bin is None or age_keygen is None:
+        pytest.fail("Required binaries `age`/`age-keygen` not found in PATH", pytrace=False)
+    return age_bin, age_keygen
+
+
+def _generate_age_identity_and_recipient(*, age_keygen: str, identity_file: Path) -> str:
     res = subprocess.run(
         [age_keygen, "-o", str(identity_file)],
         check=True,
@@ -75,28 +121,15 @@ def _seed_minimal_resource(
         session.flush()
         cat.root_id = cat.id
 
-        pub_hash = hash_token("pub")
-        pub = session.get(Auth, pub_hash)
-        if pub is None:
-            pub = Auth(
-                token_hash=pub_hash, role=Role.PUBLISHER.value, display_name="Publisher"
-            )
-            session.add(pub)
-            session.flush()
-
         res = Resource(
-            title="Item",
             magnet_uri=magnet_uri,
-            magnet_hash=magnet_uri.split("btih:")[-1],
-            content_markdown="hello",
+            magnet_hash=magnet_uri.rpartition("btih:")[2],
             cover_image_url=cover_image_url,
             cover_image_path=cover_image_path,
-            tags_json=json.dumps(["t1"]),
             category_id=cat.id,
-            publisher_token_hash=pub.token_hash,
-            team_id=None,
+            publisher_token_hash=_PUB_HASH,
             dht_status=dht_status,
-            published_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            **_SEED_RESOURCE_DEFAULTS,
         )
         session.add(res)
         ensure_build_state(session)
@@ -112,8 +145,8 @@ def test_public_export_omits_cover_url_and_includes_dht_fields(test_client):
     )
     with session_scope() as session:
         res = session.get(Resource, resource_id)
-        cats = session.query(Category).all()
-        auths = session.query(Auth).all()
+        cats = session.scalars(select(Category)).all()
+        auths = session.scalars(select(Auth)).all()
         public = resource_to_public(res, cats, auths)
 
     assert public["cover_image_url"] is None
@@ -122,131 +155,90 @@ def test_public_export_omits_cover_url_and_includes_dht_fields(test_client):
     assert public["last_dht_check"] is None
 
 
-def test_cover_localization_writes_static_file_and_sets_db_path(
-    test_client, tmp_path, monkeypatch
-):
-    resource_id = _seed_minimal_resource(
-        cover_image_url="https://example.com/a.png", cover_image_path=None
-    )
-    repo = SiteRepo(tmp_path / "site")
-    repo.ensure_base()
-
-    def fake_fetch(url: str, timeout_s: int) -> DownloadedFile:
-        return DownloadedFile(content=_ONE_BY_ONE_PNG, content_type="image/png")
-
-    monkeypatch.setattr(
-        "packages.worker.build.covers._maybe_convert_to_webp", lambda raw: None
-    )
-
-    with session_scope() as session:
-        updated = localize_cover_images(session, repo, fetch=fake_fetch)
-        assert updated == 1
-
-    with session_scope() as session:
-        res = session.get(Resource, resource_id)
-        assert res.cover_image_path == f"assets/covers/{resource_id}.png"
-
-    out_path = repo.static_dir / "assets" / "covers" / f"{resource_id}.png"
-    assert out_path.exists()
-    assert out_path.read_bytes() == _ONE_BY_ONE_PNG
-
-    # Running again is a no-op when cover_image_path is already set.
-    with session_scope() as session:
-        assert localize_cover_images(session, repo, fetch=fake_fetch) == 0
-
-
-def test_cover_localization_relocalizes_when_file_missing(
-    test_client, tmp_path, monkeypatch
-):
-    resource_id = _seed_minimal_resource(
-        cover_image_url="https://example.com/a.png",
-        cover_image_path="assets/covers/missing.png",
-    )
-    repo = SiteRepo(tmp_path / "site")
-    repo.ensure_base()
-
-    def fake_fetch(url: str, timeout_s: int) -> DownloadedFile:
-        return DownloadedFile(content=_ONE_BY_ONE_PNG, content_type="image/png")
-
-    monkeypatch.setattr(
-        "packages.worker.build.covers._maybe_convert_to_webp", lambda raw: None
-    )
-
-    with session_scope() as session:
-        updated = localize_cover_images(session, repo, fetch=fake_fetch)
-        assert updated == 1
+# One immutable instance shared by every fake fetch.
+_FAKE_DOWNLOAD = DownloadedFile(content=ONE_BY_ONE_PNG, content_type="image/png")
 
-    with session_scope() as session:
-        res = session.get(Resource, resource_id)
-        assert res.cover_image_path == f"assets/covers/{resource_id}.png"
 
-    out_path = repo.static_dir / "assets" / "covers" / f"{resource_id}.png"
-    assert out_path.exists()
-    assert out_path.read_bytes() == _ONE_BY_ONE_PNG
+def _fetch_png(url: str, timeout_s: int) -> DownloadedFile:
+    return _FAKE_DOWNLOAD
 
 
-def test_cover_localization_prefers_webp_when_converter_returns_bytes(
-    test_client, tmp_path, monkeypatch
+@pytest.mark.parametrize(
+    "cover_url, existing_path, converter, fetch, expect_ext, expected_updated",
+    [
+        # Happy path: remote PNG is written under static/assets/covers.
+        ("https://example.com/a.png", None, lambda raw: None, _fetch_png, "png", 1),
+        # DB points at a file missing from the workdir => re-localize.
+        (
+            "https://example.com/a.png",
+            "assets/covers/missing.png",
+            lambda raw: None,
+            _fetch_png,
+            "png",
+            1,
+        ),
+        # Converter output wins over the raw download.
+        ("https://example.com/a.png", None, lambda raw: b"WEBP!", _fetch_png, "webp", 1),
+        # Non-http scheme => skip, never calls fetch.
+        (
+            "file:///tmp/x.png",
+            None,
+            lambda raw: None,
+            _always_raise(AssertionError()),
+            None,
+            0,
+        ),
+        # Fetch error => best-effort skip.
+        (
+            "https://example.com/boom.png",
+            None,
+            lambda raw: None,
+            _always_raise(RuntimeError("boom")),
+            None,
+            0,
+        ),
+    ],
+    ids=["writes-file", "relocalizes-missing", "prefers-webp", "non-http", "fetch-error"],
+)
+def test_cover_localization(
+    test_client,
+    tmp_path,
+    monkeypatch,
+    cover_url,
+    existing_path,
+    converter,
+    fetch,
+    expect_ext,
+    expected_updated,
 ):
     resource_id = _seed_minimal_resource(
-        cover_image_url="https://example.com/a.png", cover_image_path=None
+        cover_image_url=cover_url, cover_image_path=existing_path
     )
     repo = SiteRepo(tmp_path / "site")
     repo.ensure_base()
-
-    def fake_fetch(url: str, timeout_s: int) -> DownloadedFile:
-        return DownloadedFile(content=_ONE_BY_ONE_PNG, content_type="image/png")
-
     monkeypatch.setattr(
-        "packages.worker.build.covers._maybe_convert_to_webp", lambda raw: b"WEBP!"
+        "packages.worker.build.covers._maybe_convert_to_webp", converter
     )
 
     with session_scope() as session:
-        updated = localize_cover_images(session, repo, fetch=fake_fetch)
-        assert updated == 1
-
-    with session_scope() as session:
+        assert localize_cover_images(session, repo, fetch=fetch) == expected_updated
+        session.flush()
         res = session.get(Resource, resource_id)
-        assert res.cover_image_path == f"assets/covers/{resource_id}.webp"
-
-    out_path = repo.static_dir / "assets" / "covers" / f"{resource_id}.webp"
-    assert out_path.exists()
-    assert out_path.read_bytes() == b"WEBP!"
-
-
-def test_cover_localization_skips_non_http_and_fetch_errors(test_client, tmp_path):
-    # Non-http scheme => skip, never calls fetch.
-    _seed_minimal_resource(
-        magnet_uri="magnet:?xt=urn:btih:abcd1234",
-        cover_image_url="file:///tmp/x.png",
-        cover_image_path=None,
-    )
-    repo = SiteRepo(tmp_path / "site")
-    repo.ensure_base()
-
-    with session_scope() as session:
-        assert (
-            localize_cover_images(
-                session, repo, fetch=lambda *_: (_ for _ in ()).throw(AssertionError())
-            )
-            == 0
-        )
+        if expect_ext is None:
+            assert res.cover_image_path == existing_path
+        else:
+            assert res.cover_image_path == f"assets/covers/{resource_id}.{expect_ext}"
+            # Running again is a no-op when cover_image_path is already set.
+            assert localize_cover_images(session, repo, fetch=fetch) == 0
 
-    # Fetch error => best-effort skip.
-    _seed_minimal_resource(
-        magnet_uri="magnet:?xt=urn:btih:beadbead",
-        cover_image_url="https://example.com/boom.png",
-        cover_image_path=None,
-    )
+    if expect_ext is not None:
+        out_path = repo.static_dir / "assets" / "covers" / f"{resource_id}.{expect_ext}"
+        assert out_path.exists()
+        expected_bytes = b"WEBP!" if expect_ext == "webp" else ONE_BY_ONE_PNG
+        assert out_path.read_bytes() == expected_bytes
 
-    def boom(url: str, timeout_s: int) -> DownloadedFile:
-        raise RuntimeError("boom")
-
-    with session_scope() as session:
-        assert localize_cover_images(session, repo, fetch=boom) == 0
 
-
-def test_age_backup_and_restore_skips_and_runs(monkeypatch, tmp_path):
+def test_age_backup_and_restore_skips_and_runs(monkeypatch, tmp_path, age_bins):
     db_file = tmp_path / "ghost.db"
     db_plain = b"sqlite"
     db_file.write_bytes(db_plain)
@@ -258,10 +250,12 @@ def test_age_backup_and_restore_skips_and_runs(monkeypatch, tmp_path):
     )
     assert res.skipped is True
 
-    # Use the real `age` binary from PATH for the happy path; fail fast if unavailable.
-    _require_on_path(os.getenv("GHOST_AGE_BIN", "age"))
+    # Use the real `age` binary from PATH for the happy path.
+    _, age_keygen = age_bins
     identity_file = tmp_path / "identity.txt"
-    recipient = _generate_age_identity_and_recipient(identity_file=identity_file)
+    recipient = _generate_age_identity_and_recipient(
+        age_keygen=age_keygen, identity_file=identity_file
+    )
     monkeypatch.setenv("GHOST_AGE_RECIPIENT", recipient)
     enc = create_age_encrypted_db_backup(
         db_path_or_url=str(db_file), backup_dir=tmp_path
@@ -288,17 +282,27 @@ def test_age_backup_and_restore_skips_and_runs(monkeypatch, tmp_path):
     assert Path(restored.output_path).read_bytes() == db_plain
 
 
-def test_age_backup_restore_roundtrip_with_generated_sqlite_data(monkeypatch, tmp_path):
-    _require_on_path(os.getenv("GHOST_AGE_BIN", "age"))
+def test_age_backup_restore_roundtrip_with_generated_sqlite_data(
+    monkeypatch, tmp_path, age_bins
+):
+    _, age_keygen = age_bins
     db_file = tmp_path / "ghost.db"
     with sqlite3.connect(db_file) as conn:
-        conn.execute("create table t(id integer primary key, v text not null)")
-        conn.execute("insert into t(v) values (?)", ("hello",))
-        conn.commit()
+        # One parsed script, no on-disk journal: this DB only exists to be backed up.
+        conn.executescript(
+            """
+            PRAGMA journal_mode=MEMORY;
+            PRAGMA synchronous=OFF;
+            CREATE TABLE t(id INTEGER PRIMARY KEY, v TEXT NOT NULL);
+            INSERT INTO t(v) VALUES ('hello');
+            """
+        )
     original_bytes = db_file.read_bytes()
 
     identity_file = tmp_path / "identity.txt"
-    recipient = _generate_age_identity_and_recipient(identity_file=identity_file)
+    recipient = _generate_age_identity_and_recipient(
+        age_keygen=age_keygen, identity_file=identity_file
+    )
 
     monkeypatch.setenv("GHOST_AGE_RECIPIENT", recipient)
     monkeypatch.setenv("GHOST_AGE_IDENTITY_FILE", str(identity_file))
@@ -328,7 +332,7 @@ def test_age_backup_restore_roundtrip_with_generated_sqlite_data(monkeypatch, tm
     [("Unknown", "Active", True), ("Active", "Active", False)],
 )
 def test_dht_scan_updates_status_and_marks_pending(
-    test_client, initial, expected, should_pending
+    test_client, dht_loop, initial, expected, should_pending
 ):
     resource_id = _seed_minimal_resource(
         magnet_uri="magnet:?xt=urn:btih:feedface", dht_status=initial
@@ -342,29 +346,37 @@ def test_dht_scan_updates_status_and_marks_pending(
         def close(self) -> None:
             return None
 
-    asyncio.run(
+    dht_loop.run_until_complete(
         run_dht_health_scan(
             sample_size=10, timeout_s=1, checker_factory=lambda: FakeChecker()
         )
     )
 
+    # One round-trip for all three columns instead of two session.get() SELECTs.
     with session_scope() as session:
-        res = session.get(Resource, resource_id)
-        state = session.get(BuildState, 1)
-        assert res.dht_status == expected
-        assert res.last_dht_check is not None
-        assert state.pending_changes is should_pending
+        dht_status, last_dht_check, pending_changes = session.execute(
+            select(
+                Resource.dht_status,
+                Resource.last_dht_check,
+                BuildState.pending_changes,
+            )
+            .join(BuildState, true())
+            .where(Resource.id == resource_id)
+        ).one()
+    assert dht_status == expected
+    assert last_dht_check is not None
+    assert pending_changes is should_pending
 
 
 def test_dht_scan_checker_unavailable_keeps_pending_false_when_already_unknown(
-    test_client,
+    test_client, dht_loop
 ):
     _seed_minimal_resource(magnet_uri="magnet:?xt=urn:btih:aaaa", dht_status="Unknown")
-    asyncio.run(
+    dht_loop.run_until_complete(
         run_dht_health_scan(
             sample_size=10,
             timeout_s=1,
-            checker_factory=lambda: (_ for _ in ()).throw(RuntimeError("no")),
+            checker_factory=_always_raise(RuntimeError("no")),
         )
     )
 
@@ -373,12 +385,12 @@ def test_dht_scan_checker_unavailable_keeps_pending_false_when_already_unknown(
         assert state.pending_changes is False
 
 
-def test_dht_scan_no_resources_is_noop(test_client):
+def test_dht_scan_no_resources_is_noop(test_client, dht_loop):
     # Do not seed resources.
-    asyncio.run(
+    dht_loop.run_until_complete(
         run_dht_health_scan(
             sample_size=10,
             timeout_s=1,
-            checker_factory=lambda: (_ for _ in ()).throw(AssertionError()),
+            checker_factory=_always_raise(AssertionError()),
         )
     )
@@ -1,36 +1,31 @@
-import json
 from datetime import datetime, timezone
 from pathlib import Path
 
 from fastapi.testclient import TestClient
 
-COVER_URL = "https://example.com/cover.jpg"
-_ONE_BY_ONE_PNG = (
-    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01"
-    b"\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\x0bIDATx\x9cc``\x00"
-    b"\x00\x00\x02\x00\x01\xe2!\xbc3\x00\x00\x00\x00IEND\xaeB`\x82"
+from conftest import (
+    ONE_BY_ONE_PNG,
+    auth_header,
+    load_json,
+    parse_front_matter,
+    rebind_engine,
 )
+from packages.core.auth import hash_token
+from packages.worker.build.covers import DownloadedFile
 
-
-def rebind_engine_for_test(db_url: str):
-    """Reload DB and API modules against a temporary database."""
-    import importlib
-    import os
-
-    os.environ["GHOST_DB_PATH"] = db_url
-    db_engine_module = importlib.reload(importlib.import_module("packages.db.engine"))
-    importlib.reload(importlib.import_module("packages.db"))
-    importlib.reload(importlib.import_module("apps.api.deps"))
-    api_main = importlib.reload(importlib.import_module("apps.api.main"))
-
-    from packages.db import Base
-
-    Base.metadata.create_all(db_engine_module.engine)
-    return api_main.app
+COVER_URL = "https://example.com/cover.jpg"
+# One immutable instance shared by every fake fetch.
+_FAKE_DOWNLOAD = DownloadedFile(content=ONE_BY_ONE_PNG, content_type="image/png")
+ADMIN_TOKEN = "admin-raw"
+PUBLISHER_TOKEN = "publisher-raw"
+# KDF output is deterministic per token; hash once at import instead of per seed.
+_PUB_HASH = hash_token("pub")
+_ADMIN_HASH = hash_token(ADMIN_TOKEN)
+_PUBLISHER_HASH = hash_token(PUBLISHER_TOKEN)
 
 
 def seed_data():
-    from packages.core.auth import Role, hash_token
+    from packages.core.auth import Role
     from packages.db import Auth, Category, Resource, ensure_build_state, session_scope
 
     with session_scope() as session:
@@ -42,7 +37,7 @@ def seed_data():
         cat.root_id = cat.id
 
         publisher = Auth(
-            token_hash=hash_token("pub"),
+            token_hash=_PUB_HASH,
             role=Role.PUBLISHER.value,
             display_name="Publisher",
         )
@@ -67,39 +62,27 @@ def seed_data():
         return res.id
 
 
-def test_run_build_pipeline_exports_content_and_index(db_url, tmp_path, monkeypatch):
+def test_run_build_pipeline_exports_content_and_index(isolated_db, tmp_path, monkeypatch):
     workdir = tmp_path / "site"
-    monkeypatch.setenv("GHOST_DB_PATH", db_url)
     monkeypatch.setenv("GHOST_SITE_WORKDIR", str(workdir))
-    monkeypatch.setenv("GHOST_ENABLE_SCHEDULER", "0")
-    monkeypatch.setenv("GHOST_MAGNET_METADATA_BACKEND", "mock")
-    monkeypatch.setenv("GHOST_MAGNET_METADATA_DIR", str(tmp_path / "magnet-metadata"))
-    rebind_engine_for_test(db_url)
     resource_id = seed_data()
 
     def fake_fetch(url: str, timeout_s: int):
-        from packages.worker.build.covers import DownloadedFile
-
-        return DownloadedFile(content=_ONE_BY_ONE_PNG, content_type="image/png")
+        return _FAKE_DOWNLOAD
 
     def patched_localize(session, repo):
         from packages.worker.build.covers import localize_cover_images
 
-        return localize_cover_images(session, repo, fetch=fake_fetch)
-
-    monkeypatch.setattr(
-        "packages.worker.build.pipeline.localize_cover_images", patched_localize
-    )
+        # No-op converter: keep the placeholder PNG as-is instead of decoding it.
+        return localize_cover_images(
+            session, repo, fetch=fake_fetch, convert=lambda raw: None
+        )
 
     backup_calls = []
 
     def fake_backup():
         backup_calls.append(True)
 
-    monkeypatch.setattr(
-        "packages.worker.build.pipeline.create_age_encrypted_db_backup", fake_backup
-    )
-
     hugo_calls = []
 
     def fake_hugo(repo, hugo_bin="hugo"):
@@ -107,12 +90,15 @@ def test_run_build_pipeline_exports_content_and_index(db_url, tmp_path, monkeypa
         repo.public_dir.mkdir(parents=True, exist_ok=True)
         (repo.public_dir / "index.html").write_text("ok", encoding="utf-8")
 
-    monkeypatch.setattr("packages.worker.build.pipeline.run_hugo_build", fake_hugo)
-
     from packages.worker.build.pipeline import run_build_pipeline
     from packages.db import BuildState, session_scope
 
-    run_build_pipeline(force=True)
+    run_build_pipeline(
+        force=True,
+        hugo_runner=fake_hugo,
+        cover_localizer=patched_localize,
+        backup_fn=fake_backup,
+    )
 
     # Hugo invoked with expected paths
     assert hugo_calls
@@ -126,17 +112,18 @@ def test_run_build_pipeline_exports_content_and_index(db_url, tmp_path, monkeypa
     content_file = workdir / "content" / "resources" / f"{resource_id}.md"
     assert content_file.exists()
     content = content_file.read_text(encoding="utf-8")
-    assert "magnet:?xt=urn:btih:abcd1234" in content
-    assert "tag1" in content
+    front_matter = parse_front_matter(content)
+    assert front_matter["magnet_uri"] == "magnet:?xt=urn:btih:abcd1234"
+    assert "tag1" in front_matter["tags"]
     assert COVER_URL not in content
 
     # Search index manifest and shard
     manifest_path = workdir / "static" / "index" / "manifest.json"
     assert manifest_path.exists()
-    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest = load_json(manifest_path)
     assert manifest["shards"]
     shard_file = manifest["shards"][0]["file"]
-    shard = json.loads((manifest_path.parent / shard_file).read_text(encoding="utf-8"))
+    shard = load_json((manifest_path.parent / shard_file))
     assert shard["items"][0]["url"] == f"/resources/{resource_id}/"
     assert shard["items"][0]["published_at"].startswith("2024-01")
     assert shard["items"][0]["cover_image_url"] is None
@@ -153,6 +140,54 @@ def test_run_build_pipeline_exports_content_and_index(db_url, tmp_path, monkeypa
         assert state.last_build_at is not None
 
 
+def test_build_search_index_in_memory():
+    """Shard grouping and item serialization, asserted without any disk I/O."""
+    from packages.worker.build.export_index import build_search_index
+
+    items = [
+        {
+            "id": 1,
+            "title": "January Item",
+            "magnet_uri": "magnet:?xt=urn:btih:abcd1234",
+            "magnet_hash": "abcd1234",
+            "tags": ["tag1"],
+            "category_id": 3,
+            "category_path": "movies",
+            "category_name": "Movies",
+            "publisher_name": "Publisher",
+            "team_id": None,
+            "content_markdown": "Some description\n\nMore text",
+            "published_at": datetime(2024, 1, 20, tzinfo=timezone.utc),
+        },
+        {
+            "id": 2,
+            "title": "February Item",
+            "magnet_uri": "magnet:?xt=urn:btih:feedface",
+            "magnet_hash": "feedface",
+            "tags": [],
+            "category_id": 3,
+            "category_path": "movies",
+            "category_name": "Movies",
+            "publisher_name": "Publisher",
+            "team_id": None,
+            "content_markdown": "",
+            "published_at": datetime(2024, 2, 2, tzinfo=timezone.utc),
+        },
+    ]
+
+    index = build_search_index(items)
+
+    assert [s["key"] for s in index.manifest["shards"]] == ["2024-01", "2024-02"]
+    assert [s["count"] for s in index.manifest["shards"]] == [1, 1]
+    shard = index.shards["index-2024-01.json"]
+    first = shard["items"][0]
+    assert first["url"] == "/resources/1/"
+    assert first["published_at"].startswith("2024-01")
+    assert first["summary"] == "Some description More text"
+    assert first["publisher"] == "Publisher"
+    assert "index-2024-02.json" in index.shards
+
+
 def test_integrated_mode_mounts_public_site(db_url, tmp_path, monkeypatch):
     workdir = tmp_path / "site"
     public = workdir / "public"
@@ -165,7 +200,7 @@ def test_integrated_mode_mounts_public_site(db_url, tmp_path, monkeypatch):
     monkeypatch.setenv("GHOST_ENABLE_SCHEDULER", "0")
     monkeypatch.setenv("GHOST_MAGNET_METADATA_BACKEND", "mock")
     monkeypatch.setenv("GHOST_MAGNET_METADATA_DIR", str(tmp_path / "magnet-metadata"))
-    app = rebind_engine_for_test(db_url)
+    app = rebind_engine(db_url)
 
     client = TestClient(app)
     res = client.get("/")
@@ -173,32 +208,25 @@ def test_integrated_mode_mounts_public_site(db_url, tmp_path, monkeypatch):
     assert "Hello" in res.text
 
 
-def test_full_flow_invite_and_build(db_url, tmp_path, monkeypatch):
+def test_full_flow_invite_and_build(test_client, tmp_path, monkeypatch):
     """Full path: seed admin/publisher, create team+invite, publish resource, build static site."""
     workdir = tmp_path / "site"
-    monkeypatch.setenv("GHOST_DB_PATH", db_url)
     monkeypatch.setenv("GHOST_SITE_WORKDIR", str(workdir))
-    monkeypatch.setenv("GHOST_DEPLOY_MODE", "integrated")
-    monkeypatch.setenv("GHOST_ENABLE_SCHEDULER", "0")
-    monkeypatch.setenv("GHOST_MAGNET_METADATA_BACKEND", "mock")
-    monkeypatch.setenv("GHOST_MAGNET_METADATA_DIR", str(tmp_path / "magnet-metadata"))
-    app = rebind_engine_for_test(db_url)
 
-    from packages.core.auth import Role, hash_token
+    from packages.core.auth import Role
     from packages.db import Auth, ensure_build_state, session_scope
 
-    admin_token = "admin-raw"
-    publisher_token = "publisher-raw"
+    publisher_token = PUBLISHER_TOKEN
     with session_scope() as session:
         session.add_all(
             [
                 Auth(
-                    token_hash=hash_token(admin_token),
+                    token_hash=_ADMIN_HASH,
                     role=Role.ADMIN.value,
                     display_name="Admin",
                 ),
                 Auth(
-                    token_hash=hash_token(publisher_token),
+                    token_hash=_PUBLISHER_HASH,
                     role=Role.PUBLISHER.value,
                     display_name="Publisher",
                 ),
@@ -207,10 +235,7 @@ def test_full_flow_invite_and_build(db_url, tmp_path, monkeypatch):
         ensure_build_state(session)
         session.commit()
 
-    client = TestClient(app)
-
-    def auth_header(token: str) -> dict[str, str]:
-        return {"Authorization": f"Bearer {token}"}
+    client = test_client
 
     # Create category
     res = client.post(
@@ -259,23 +284,22 @@ def test_full_flow_invite_and_build(db_url, tmp_path, monkeypatch):
         repo.public_dir.mkdir(parents=True, exist_ok=True)
         (repo.public_dir / "index.html").write_text("ok", encoding="utf-8")
 
-    monkeypatch.setattr("packages.worker.build.pipeline.run_hugo_build", fake_hugo)
-
     from packages.worker.build.pipeline import run_build_pipeline
 
-    run_build_pipeline(force=True)
+    run_build_pipeline(force=True, hugo_runner=fake_hugo)
 
     assert hugo_calls, "Hugo should be invoked during build"
 
     # Generated content and index include resource
     content_file = workdir / "content" / "resources" / f"{resource_id}.md"
     assert content_file.exists()
-    assert magnet_uri in content_file.read_text(encoding="utf-8")
+    content_text = content_file.read_text(encoding="utf-8")
+    assert magnet_uri in content_text
 
     manifest_path = workdir / "static" / "index" / "manifest.json"
-    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest = load_json(manifest_path)
     shard_file = manifest["shards"][0]["file"]
-    shard = json.loads((manifest_path.parent / shard_file).read_text(encoding="utf-8"))
+    shard = load_json((manifest_path.parent / shard_file))
     urls = {item["url"] for item in shard["items"]}
     assert f"/resources/{resource_id}/" in urls
     target = next(item for item in shard["items"] if item["id"] == resource_id)
@@ -289,7 +313,8 @@ def test_full_flow_invite_and_build(db_url, tmp_path, monkeypatch):
     assert target["summary"] == "Hello world"
 
     # Front matter reflects publisher/category/tags
-    content_text = content_file.read_text(encoding="utf-8")
-    assert "category_name: Docs" in content_text
-    assert "publisher: Team X member" in content_text
-    assert "tags:\n- x\n- y" in content_text
+    front_matter = parse_front_matter(content_text)
+    assert front_matter["category_name"] == "Docs"
+    assert front_matter["publisher"] == "Team X member"
+    assert front_matter["tags"] == ["x", "y"]
+    assert front_matter["magnet_uri"] == magnet_uri
@@ -1,60 +1,56 @@
 import re
 
-from packages.worker.build.hugo import ensure_hugo_scaffold
-from packages.worker.site_repo import SiteRepo
+import pytest
+
+
+# Match `.Date.Format "..."` or `.Date.Format `...`` with arbitrary whitespace.
+_GO_DATE_RE = re.compile(
+    r"""\.Date\.Format\s+(?:(?:"([^"]*)")|(?:`([^`]*)`))""", re.MULTILINE
+)
 
 
 def _has_go_date_format(template: str, expected_format: str) -> bool:
-    # Match `.Date.Format "..."` or `.Date.Format `...`` with arbitrary whitespace.
-    pattern = re.compile(
-        r"""\.Date\.Format\s+(?:(?:"([^"]*)")|(?:`([^`]*)`))""", re.MULTILINE
-    )
-    for match in pattern.finditer(template):
+    for match in _GO_DATE_RE.finditer(template):
         value = match.group(1) or match.group(2) or ""
         if value.strip() == expected_format:
             return True
     return False
 
 
-def test_homepage_relative_time_datetime_is_parseable(tmp_path):
-    repo = SiteRepo(tmp_path / "site")
-    ensure_hugo_scaffold(repo)
-    list_template = (repo.layouts_dir / "_default" / "list.html").read_text(
-        encoding="utf-8"
-    )
-    assert 'class="relative-time"' in list_template
-    assert _has_go_date_format(list_template, "2006-01-02T15:04:05Z07:00")
-
-
-def test_detail_page_uses_local_datetime_rendering(tmp_path):
-    repo = SiteRepo(tmp_path / "site")
-    ensure_hugo_scaffold(repo)
-    template = (repo.layouts_dir / "_default" / "single.html").read_text(
+@pytest.mark.parametrize(
+    "template_rel, markers",
+    [
+        ("list.html", ['class="relative-time"']),
+        ("single.html", ['class="local-datetime"', "filetree.html", "<details"]),
+    ],
+    ids=["homepage-relative-time", "detail-local-datetime"],
+)
+def test_templates_render_parseable_datetimes(
+    hugo_scaffold_template, template_rel, markers
+):
+    template = (hugo_scaffold_template.layouts_dir / "_default" / template_rel).read_text(
         encoding="utf-8"
     )
-    assert 'class="local-datetime"' in template
+    for marker in markers:
+        assert marker in template
     assert _has_go_date_format(template, "2006-01-02T15:04:05Z07:00")
-    assert "filetree.html" in template
-    assert "<details" in template
-
-    relative_time_js = (repo.static_dir / "js" / "relative-time.js").read_text(
-        encoding="utf-8"
-    )
-    assert 'Intl.DateTimeFormat("sv-SE"' in relative_time_js
-    assert "raw.trim()" in relative_time_js
 
 
-def test_hugo_scaffold_includes_partials(tmp_path):
-    repo = SiteRepo(tmp_path / "site")
-    ensure_hugo_scaffold(repo)
-    partial = repo.layouts_dir / "partials" / "filetree.html"
+def test_hugo_scaffold_includes_partials(hugo_scaffold_template):
+    partial = hugo_scaffold_template.layouts_dir / "partials" / "filetree.html"
     assert partial.exists()
 
 
-def test_js_listings_render_files_collapsible(tmp_path):
-    repo = SiteRepo(tmp_path / "site")
-    ensure_hugo_scaffold(repo)
-    search_js = (repo.static_dir / "js" / "search.js").read_text(encoding="utf-8")
-    catalog_js = (repo.static_dir / "js" / "catalog.js").read_text(encoding="utf-8")
-    assert "<details" in search_js and "file-tree-inline" in search_js
-    assert "<details" in catalog_js and "file-tree-inline" in catalog_js
+@pytest.mark.parametrize(
+    "js_rel, markers",
+    [
+        ("relative-time.js", ['Intl.DateTimeFormat("sv-SE"', "raw.trim()"]),
+        ("search.js", ["<details", "file-tree-inline"]),
+        ("catalog.js", ["<details", "file-tree-inline"]),
+    ],
+    ids=["relative-time", "search-listing", "catalog-listing"],
+)
+def test_static_js_markers(hugo_scaffold_template, js_rel, markers):
+    js = (hugo_scaffold_template.static_dir / "js" / js_rel).read_text(encoding="utf-8")
+    for marker in markers:
+        assert marker in js
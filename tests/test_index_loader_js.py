@@ -0,0 +1,41 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def collected_docs(hugo_scaffold_template):
+    """Run the index-loader dedupe script once per session.
+
+    Node cold-start dominates this check, and the scaffold JS is static, so
+    the subprocess output is shared across tests.
+    """
+    node = shutil.which("node")
+    if node is None:
+        pytest.fail("Required binary `node` not found in PATH", pytrace=False)
+    loader_path = hugo_scaffold_template.static_dir / "js" / "index-loader.js"
+    script = f"""
+const fs = require("fs");
+const vm = require("vm");
+const code = fs.readFileSync("{loader_path.as_posix()}", "utf8");
+const ctx = {{ console }};
+vm.createContext(ctx);
+vm.runInContext(code, ctx);
+const loader = ctx.GhostIndexLoader;
+const hits = [{{ result: [{{ doc: 1 }}, {{ doc: "1" }}, {{ doc: {{ id: 1 }} }}] }}];
+const map = new Map([["1", {{ id: "1", title: "dup" }}]]);
+const docs = loader.collectDocsFromHits(hits, map);
+console.log(JSON.stringify(docs));
+"""
+    proc = subprocess.run(
+        [node, "-e", script], capture_output=True, text=True, check=True
+    )
+    return json.loads(proc.stdout.strip() or "[]")
+
+
+def test_collect_docs_dedupes_number_and_string_ids(collected_docs):
+    # Duplicate hits (number vs string ids) should collapse to one doc.
+    assert len(collected_docs) == 1
+    assert collected_docs[0]["title"] == "dup"
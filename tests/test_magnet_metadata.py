@@ -1,23 +1,143 @@
 from packages.core.magnet_metadata import MagnetFile, build_file_tree
 
 
-def test_build_file_tree_aggregates_sizes_and_counts():
-    files = [
-        MagnetFile(path="dir/a.txt", size_bytes=100),
-        MagnetFile(path="dir/sub/b.bin", size_bytes=200),
-        MagnetFile(path="c.bin", size_bytes=50),
-    ]
-    tree = build_file_tree(files)
+def _flatten(nodes: list[dict], prefix: str = "") -> list[tuple]:
+    """Project a tree into (path, type, size_bytes[, file_count]) tuples.
+
+    Keeps the expected tables below compact while still asserting structure,
+    ordering and aggregation in one shot.
+    """
+    out: list[tuple] = []
+    for node in nodes:
+        assert "size_human" in node
+        path = f"{prefix}{node['name']}"
+        if node["type"] == "dir":
+            out.append((path, "dir", node["size_bytes"], node["file_count"]))
+            out.extend(_flatten(node["children"], prefix=path + "/"))
+        else:
+            out.append((path, "file", node["size_bytes"]))
+    return out
+
 
-    assert [n["name"] for n in tree] == ["dir", "c.bin"]
-    dir_node = tree[0]
-    assert dir_node["type"] == "dir"
-    assert dir_node["size_bytes"] == 300
-    assert dir_node["file_count"] == 2
-    assert dir_node["children"]
-    assert "size_human" in dir_node
+# (case id, input files, expected flattened tree)
+_TREE_CASES = [
+    (
+        "empty-input",
+        [],
+        [],
+    ),
+    (
+        "single-root-file",
+        [MagnetFile(path="a.txt", size_bytes=10)],
+        [("a.txt", "file", 10)],
+    ),
+    (
+        "single-nested-file",
+        [MagnetFile(path="dir/a.txt", size_bytes=10)],
+        [("dir", "dir", 10, 1), ("dir/a.txt", "file", 10)],
+    ),
+    (
+        "dir-aggregates-sizes-and-counts",
+        [
+            MagnetFile(path="dir/a.txt", size_bytes=100),
+            MagnetFile(path="dir/sub/b.bin", size_bytes=200),
+            MagnetFile(path="c.bin", size_bytes=50),
+        ],
+        [
+            ("dir", "dir", 300, 2),
+            ("dir/sub", "dir", 200, 1),
+            ("dir/sub/b.bin", "file", 200),
+            ("dir/a.txt", "file", 100),
+            ("c.bin", "file", 50),
+        ],
+    ),
+    (
+        "dirs-sort-before-files",
+        [
+            MagnetFile(path="aaa.txt", size_bytes=1),
+            MagnetFile(path="zzz/b.txt", size_bytes=2),
+        ],
+        [("zzz", "dir", 2, 1), ("zzz/b.txt", "file", 2), ("aaa.txt", "file", 1)],
+    ),
+    (
+        "names-sort-case-insensitively",
+        [
+            MagnetFile(path="Beta.txt", size_bytes=1),
+            MagnetFile(path="alpha.txt", size_bytes=2),
+        ],
+        [("alpha.txt", "file", 2), ("Beta.txt", "file", 1)],
+    ),
+    (
+        "backslash-paths-normalized",
+        [MagnetFile(path="dir\\sub\\a.txt", size_bytes=7)],
+        [
+            ("dir", "dir", 7, 1),
+            ("dir/sub", "dir", 7, 1),
+            ("dir/sub/a.txt", "file", 7),
+        ],
+    ),
+    (
+        "redundant-slashes-stripped",
+        [MagnetFile(path="/dir//a.txt", size_bytes=5)],
+        [("dir", "dir", 5, 1), ("dir/a.txt", "file", 5)],
+    ),
+    (
+        "empty-path-skipped",
+        [MagnetFile(path="", size_bytes=99), MagnetFile(path="a.txt", size_bytes=1)],
+        [("a.txt", "file", 1)],
+    ),
+    (
+        "file-count-counts-files-not-dirs",
+        [
+            MagnetFile(path="a/b/c/deep.txt", size_bytes=1),
+            MagnetFile(path="a/b/other.txt", size_bytes=2),
+        ],
+        [
+            ("a", "dir", 3, 2),
+            ("a/b", "dir", 3, 2),
+            ("a/b/c", "dir", 1, 1),
+            ("a/b/c/deep.txt", "file", 1),
+            ("a/b/other.txt", "file", 2),
+        ],
+    ),
+    (
+        "zero-byte-files",
+        [
+            MagnetFile(path="dir/empty.txt", size_bytes=0),
+            MagnetFile(path="dir/full.txt", size_bytes=3),
+        ],
+        [
+            ("dir", "dir", 3, 2),
+            ("dir/empty.txt", "file", 0),
+            ("dir/full.txt", "file", 3),
+        ],
+    ),
+    (
+        "duplicate-path-last-wins",
+        [
+            MagnetFile(path="a.txt", size_bytes=1),
+            MagnetFile(path="a.txt", size_bytes=9),
+        ],
+        [("a.txt", "file", 9)],
+    ),
+    (
+        "sibling-dirs-do-not-leak-counts",
+        [
+            MagnetFile(path="one/a.txt", size_bytes=10),
+            MagnetFile(path="two/b.txt", size_bytes=20),
+        ],
+        [
+            ("one", "dir", 10, 1),
+            ("one/a.txt", "file", 10),
+            ("two", "dir", 20, 1),
+            ("two/b.txt", "file", 20),
+        ],
+    ),
+]
 
-    file_node = tree[1]
-    assert file_node["type"] == "file"
-    assert file_node["size_bytes"] == 50
-    assert "size_human" in file_node
+
+def test_build_file_tree_aggregates_sizes_and_counts():
+    # One test node looping the whole table keeps pytest bookkeeping constant
+    # while covering every aggregation/ordering/normalization rule.
+    for case_id, files, expected in _TREE_CASES:
+        assert _flatten(build_file_tree(files)) == expected, case_id
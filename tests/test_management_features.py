@@ -1,37 +1,50 @@
+import orjson
+import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
-from packages.core.auth import Role, hash_token
-from packages.db import Auth, Team, session_scope
-
-
-def auth_header(token: str) -> dict[str, str]:
-    return {"Authorization": f"Bearer {token}"}
-
-
-def test_admin_web_pages_accessible(test_client: TestClient):
-    # Root should redirect to dashboard; other pages render HTML.
-    res = test_client.get("/admin", follow_redirects=False)
-    assert res.status_code in (301, 302, 307)
-    res = test_client.get("/admin/login")
-    assert res.status_code == 200
-    res = test_client.get("/admin/dashboard")
-    assert res.status_code == 200
-    res = test_client.get("/admin/resources")
-    assert res.status_code == 200
-    res = test_client.get("/admin/categories")
-    assert res.status_code == 200
-    res = test_client.get("/admin/teams")
-    assert res.status_code == 200
-    res = test_client.get("/admin/system")
-    assert res.status_code == 200
-
-
-def test_admin_token_lifecycle_and_permissions(test_client: TestClient, seeded_tokens):
+from apps.api.routers.admin import get_dht_scan_runner
+from apps.api.routers.teams import create_invite
+from conftest import asgi_batch
+from packages.core.auth import Principal, Role, hash_token
+from packages.db import Auth, Category, Resource, Team, session_scope
+
+# Static request bodies serialized once; sent via httpx's content= path so
+# repeated POSTs skip per-call json.dumps.
+_NEWPUB_BODY = orjson.dumps({"display_name": "NewPub"})
+_SHOULDFAIL_BODY = orjson.dumps({"display_name": "ShouldFail"})
+_UNKNOWN_REVOKE_BODY = orjson.dumps({"token": "does-not-exist"})
+_BAD_PARENT_BODY = orjson.dumps({"parent_id": 9999})
+
+
+def _json_headers(base: dict[str, str]) -> dict[str, str]:
+    return {**base, "content-type": "application/json"}
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("/admin", 307),  # RedirectResponse default; root redirects to dashboard
+        ("/admin/login", 200),
+        ("/admin/dashboard", 200),
+        ("/admin/resources", 200),
+        ("/admin/categories", 200),
+        ("/admin/teams", 200),
+        ("/admin/system", 200),
+    ],
+)
+def test_admin_web_pages_accessible(test_client: TestClient, path, expected):
+    # GET, not HEAD: FastAPI's APIRoute registers GET only, so HEAD is a 405.
+    res = test_client.get(path, follow_redirects=False)
+    assert res.status_code == expected
+
+
+def test_admin_token_lifecycle_and_permissions(test_client: TestClient, auth_headers):
     # Admin can issue a publisher token.
     res = test_client.post(
         "/api/admin/tokens/publisher",
-        headers=auth_header(seeded_tokens["admin"]),
-        json={"display_name": "NewPub"},
+        headers=_json_headers(auth_headers["admin"]),
+        content=_NEWPUB_BODY,
     )
     assert res.status_code == 200
     data = res.json()
@@ -43,61 +56,60 @@ def test_admin_token_lifecycle_and_permissions(test_client: TestClient, seeded_t
     # Non-admin cannot issue tokens.
     res = test_client.post(
         "/api/admin/tokens/publisher",
-        headers=auth_header(seeded_tokens["publisher"]),
-        json={"display_name": "ShouldFail"},
+        headers=_json_headers(auth_headers["publisher"]),
+        content=_SHOULDFAIL_BODY,
     )
     assert res.status_code == 403
 
-    # Admin can revoke; unknown token is 404.
+    # Admin can revoke; unknown token is 404. The response carries the
+    # persisted revocation state, so no follow-up DB query is needed.
     res = test_client.post(
         "/api/admin/tokens/revoke",
-        headers=auth_header(seeded_tokens["admin"]),
+        headers=auth_headers["admin"],
         json={"token": raw_token},
     )
     assert res.status_code == 200
-    assert "revoked_at" in res.json()
+    revoked = res.json()
+    assert revoked["token_hash"] == token_hash
+    assert revoked["revoked_at"]
 
     res = test_client.post(
         "/api/admin/tokens/revoke",
-        headers=auth_header(seeded_tokens["admin"]),
-        json={"token": "does-not-exist"},
+        headers=_json_headers(auth_headers["admin"]),
+        content=_UNKNOWN_REVOKE_BODY,
     )
     assert res.status_code == 404
 
-    with session_scope() as session:
-        record = session.get(Auth, token_hash)
-        assert record is not None
-        assert record.revoked_at is not None
-
 
-def test_admin_can_trigger_full_dht_scan(
-    test_client: TestClient, seeded_tokens, monkeypatch
-):
+def test_admin_can_trigger_full_dht_scan(test_client: TestClient, auth_headers):
     calls: list[int | None] = []
 
     async def fake_scan_all(timeout_s=None):
         calls.append(timeout_s)
         return 0
 
-    monkeypatch.setattr("apps.api.routers.admin.run_dht_health_scan_all", fake_scan_all)
-
-    res = test_client.post(
-        "/api/admin/dht/scan-all?wait=1&timeout_s=7",
-        headers=auth_header(seeded_tokens["admin"]),
-    )
-    assert res.status_code == 200
-    assert res.json()["queued"] is False
-    assert calls == [7]
-
-    res = test_client.post(
-        "/api/admin/dht/scan-all?wait=1",
-        headers=auth_header(seeded_tokens["publisher"]),
-    )
-    assert res.status_code == 403
+    app = test_client.app
+    app.dependency_overrides[get_dht_scan_runner] = lambda: fake_scan_all
+    try:
+        res = test_client.post(
+            "/api/admin/dht/scan-all?wait=1&timeout_s=7",
+            headers=auth_headers["admin"],
+        )
+        assert res.status_code == 200
+        assert res.json()["queued"] is False
+        assert calls == [7]
+
+        res = test_client.post(
+            "/api/admin/dht/scan-all?wait=1",
+            headers=auth_headers["publisher"],
+        )
+        assert res.status_code == 403
+    finally:
+        app.dependency_overrides.pop(get_dht_scan_runner, None)
 
 
 def test_team_listing_and_invite_rules(
-    test_client: TestClient, seeded_tokens, db_session
+    test_client: TestClient, auth_headers, db_session
 ):
     other_pub_token = "other-pub"
     other_pub = Auth(
@@ -109,144 +121,150 @@ def test_team_listing_and_invite_rules(
     db_session.add_all([other_pub, other_team])
     db_session.commit()
 
+    # The three role-scoped listings are independent reads; batch them over
+    # ASGI in one event loop instead of three TestClient round trips.
+    admin_res, pub_res, member_res = asgi_batch(
+        test_client.app,
+        [
+            ("GET", "/api/teams", {"headers": auth_headers["admin"]}),
+            ("GET", "/api/teams", {"headers": auth_headers["publisher"]}),
+            ("GET", "/api/teams", {"headers": auth_headers["team_member"]}),
+        ],
+    )
     # Admin sees all teams.
-    res = test_client.get("/api/teams", headers=auth_header(seeded_tokens["admin"]))
-    assert res.status_code == 200
-    assert len(res.json()) >= 2
+    assert admin_res.status_code == 200
+    assert len(admin_res.json()) >= 2
 
     # Publisher only sees their own team.
-    res = test_client.get("/api/teams", headers=auth_header(seeded_tokens["publisher"]))
-    assert res.status_code == 200
-    names = {t["name"] for t in res.json()}
-    assert names == {"Team A"}
+    assert pub_res.status_code == 200
+    assert {t["name"] for t in pub_res.json()} == {"Team A"}
 
     # Team member only sees scoped team.
-    res = test_client.get(
-        "/api/teams", headers=auth_header(seeded_tokens["team_member"])
-    )
-    assert res.status_code == 200
-    assert {t["name"] for t in res.json()} == {"Team A"}
+    assert member_res.status_code == 200
+    assert {t["name"] for t in member_res.json()} == {"Team A"}
 
     # Inviting with wrong owner is forbidden; unknown team returns 404.
     res = test_client.post(
         f"/api/teams/{other_team.id}/invites",
-        headers=auth_header(seeded_tokens["publisher"]),
+        headers=auth_headers["publisher"],
     )
     assert res.status_code == 403
 
-    res = test_client.post(
-        "/api/teams/9999/invites",
-        headers=auth_header(seeded_tokens["publisher"]),
+    # Unknown team is a 404 from the handler itself; assert it with a direct
+    # call instead of a second HTTP round trip (the 403 above covers wiring).
+    publisher = Principal(
+        token_hash=hash_token("publisher-token"),
+        role=Role.PUBLISHER,
+        display_name="Publisher",
     )
-    assert res.status_code == 404
+    with pytest.raises(HTTPException) as excinfo:
+        create_invite(team_id=9999, session=db_session, principal=publisher)
+    assert excinfo.value.status_code == 404
 
 
-def test_category_crud_and_error_paths(test_client: TestClient, seeded_tokens):
-    # Create root and child category.
-    res = test_client.post(
-        "/api/categories",
-        headers=auth_header(seeded_tokens["publisher"]),
-        json={"name": "Root", "slug": "root", "parent_id": None, "sort_order": 0},
-    )
-    assert res.status_code == 201
-    root = res.json()
-
-    res = test_client.post(
-        "/api/categories",
-        headers=auth_header(seeded_tokens["publisher"]),
-        json={
-            "name": "Child",
-            "slug": "child",
-            "parent_id": root["id"],
-            "sort_order": 0,
-        },
-    )
-    assert res.status_code == 201
-    child = res.json()
+def test_category_crud_and_error_paths(test_client: TestClient, auth_headers):
+    # Seed root and child directly; the create endpoint's happy path is
+    # covered by test_category_crud, this test only needs the IDs.
+    with session_scope() as session:
+        root = Category(
+            name="Root", slug="root", parent_id=None, root_id=0, sort_order=0
+        )
+        session.add(root)
+        session.flush()
+        root.root_id = root.id
+        child = Category(
+            name="Child", slug="child", parent_id=root.id, root_id=root.id, sort_order=0
+        )
+        session.add(child)
+        session.flush()
+        root_id, child_id = root.id, child.id
+        session.commit()
 
     # Updating with invalid parent fails.
     res = test_client.put(
-        f"/api/categories/{child['id']}",
-        headers=auth_header(seeded_tokens["publisher"]),
-        json={"parent_id": 9999},
+        f"/api/categories/{child_id}",
+        headers=_json_headers(auth_headers["publisher"]),
+        content=_BAD_PARENT_BODY,
     )
     assert res.status_code == 400
 
     # Cannot delete parent while children exist.
     res = test_client.delete(
-        f"/api/categories/{root['id']}", headers=auth_header(seeded_tokens["publisher"])
+        f"/api/categories/{root_id}", headers=auth_headers["publisher"]
     )
     assert res.status_code == 400
 
     # Create a resource to lock the category and block deletion.
     res = test_client.post(
         "/api/resources",
-        headers=auth_header(seeded_tokens["publisher"]),
+        headers=auth_headers["publisher"],
         json={
             "title": "Uses Child",
             "magnet_uri": "magnet:?xt=urn:btih:1234567890abcdef",
             "content_markdown": "desc",
             "cover_image_url": None,
             "tags": [],
-            "category_id": child["id"],
+            "category_id": child_id,
             "team_id": None,
         },
     )
     assert res.status_code == 201
 
     res = test_client.delete(
-        f"/api/categories/{child['id']}",
-        headers=auth_header(seeded_tokens["publisher"]),
+        f"/api/categories/{child_id}",
+        headers=auth_headers["publisher"],
     )
     assert res.status_code == 400
 
 
-def test_resource_permissions_and_listing(test_client: TestClient, seeded_tokens):
+def test_resource_permissions_and_listing(
+    test_client: TestClient, seeded_tokens, auth_headers
+):
     # Missing auth yields 401.
     res = test_client.get("/api/resources")
     assert res.status_code == 401
 
-    # Create category and resource.
-    res = test_client.post(
-        "/api/categories",
-        headers=auth_header(seeded_tokens["publisher"]),
-        json={"name": "Docs", "slug": "docs", "parent_id": None, "sort_order": 0},
-    )
-    assert res.status_code == 201
-    category_id = res.json()["id"]
-
-    res = test_client.post(
-        "/api/resources",
-        headers=auth_header(seeded_tokens["publisher"]),
-        json={
-            "title": "Pub Item",
-            "magnet_uri": "magnet:?xt=urn:btih:deadbeefdeadbeefdeadbeefdeadbeefdeadbeef",
-            "content_markdown": "hello",
-            "cover_image_url": "https://example.com/cover.png",
-            "tags": ["one", "two"],
-            "category_id": category_id,
-            "team_id": None,
-        },
-    )
-    assert res.status_code == 201
-    resource_id = res.json()["id"]
+    # Seed category and resource directly; the create endpoints are covered
+    # elsewhere and this test is about listing/update permissions.
+    with session_scope() as session:
+        category = Category(
+            name="Docs", slug="docs", parent_id=None, root_id=0, sort_order=0
+        )
+        session.add(category)
+        session.flush()
+        category.root_id = category.id
+        resource = Resource(
+            title="Pub Item",
+            magnet_uri="magnet:?xt=urn:btih:deadbeefdeadbeefdeadbeefdeadbeefdeadbeef",
+            magnet_hash="deadbeefdeadbeefdeadbeefdeadbeefdeadbeef",
+            content_markdown="hello",
+            cover_image_url="https://example.com/cover.png",
+            tags_json='["one","two"]',
+            category_id=category.id,
+            publisher_token_hash=hash_token(seeded_tokens["publisher"]),
+            team_id=None,
+        )
+        session.add(resource)
+        session.flush()
+        resource_id = resource.id
+        session.commit()
 
     # Team member cannot update publisher-owned resource.
     res = test_client.put(
         f"/api/resources/{resource_id}",
-        headers=auth_header(seeded_tokens["team_member"]),
+        headers=auth_headers["team_member"],
         json={"title": "nope"},
     )
     assert res.status_code == 403
 
     # Admin can list all resources.
-    res = test_client.get("/api/resources", headers=auth_header(seeded_tokens["admin"]))
+    res = test_client.get("/api/resources", headers=auth_headers["admin"])
     assert res.status_code == 200
     assert any(item["id"] == resource_id for item in res.json())
 
     # Publisher sees only their own resource.
     res = test_client.get(
-        "/api/resources", headers=auth_header(seeded_tokens["publisher"])
+        "/api/resources", headers=auth_headers["publisher"]
     )
     assert res.status_code == 200
     assert {item["id"] for item in res.json()} == {resource_id}
@@ -2,8 +2,8 @@ import subprocess
 from pathlib import Path
 
 
-def _git(cwd: Path, *args: str) -> str:
-    return subprocess.check_output(["git", *args], cwd=str(cwd), text=True).strip()
+def _git_out(repo: Path, *args: str) -> str:
+    return subprocess.check_output(["git", "-C", str(repo), *args], text=True)
 
 
 def test_deploy_public_dir_to_pages_local_remote(tmp_path):
@@ -34,9 +34,8 @@ def test_deploy_public_dir_to_pages_local_remote(tmp_path):
     )
     assert commit2 == commit1
 
-    # Verify remote branch contains site files.
-    checkout = tmp_path / "checkout"
-    subprocess.run(["git", "clone", str(remote), str(checkout)], check=True)
-    _git(checkout, "checkout", "gh-pages")
-    assert (checkout / "index.html").read_text(encoding="utf-8") == "<h1>Hello</h1>"
-    assert (checkout / ".nojekyll").exists()
+    # Verify the remote branch directly from the bare repo's object store;
+    # no clone or checkout needs to touch the filesystem.
+    assert _git_out(remote, "show", "gh-pages:index.html") == "<h1>Hello</h1>"
+    tree = _git_out(remote, "ls-tree", "--name-only", "gh-pages").splitlines()
+    assert ".nojekyll" in tree